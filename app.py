@@ -7,30 +7,37 @@ Features
 - Part B (ranking): rank 4 images (one per provider) for the same prompt/seed.
 - Part C (diversity): rate diversity of 5 variations (same model, 5 seeds).
 - Reads latest manifests from E:\research\<provider>\manifests\run-*\manifest.csv.
-- Serves images directly from disk (whitelisted roots).
+- Serves images directly from disk (only files listed in the loaded manifests).
 - Stores responses in SQLite (E:\research\survey_results by default).
 - Admin dashboard (login protected) with live tables and CHARTS (Chart.js).
 - Full-session flow: /start/full walks A → B → C automatically; optional ?A=12&B=8&C=6 overrides.
 
-Requirements: Flask, python-dotenv, PyYAML
+Requirements: Flask, python-dotenv, PyYAML, orjson
 """
 
 from __future__ import annotations
-import base64, csv, json, os, random, sqlite3, string, time, uuid, math
+import atexit, csv, gzip, hashlib, io, os, queue, random, sqlite3, string, time, uuid, math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from dataclasses import dataclass
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timezone
+from pathlib import Path, PurePath
+from urllib.parse import quote
 from typing import Dict, List, Tuple, Any
 
 from flask import (
-    Flask, render_template, render_template_string, request, redirect,
+    Flask, Blueprint, render_template, render_template_string, request, redirect,
     url_for, send_file, abort, session, flash, jsonify
 )
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+import orjson
 import yaml
-from functools import wraps
+from functools import lru_cache
 import threading
-from collections import defaultdict
+from collections import defaultdict, deque
 from typing import DefaultDict, Set
 # ---------------------------- Bootstrapping assets ----------------------------
 
@@ -143,7 +150,7 @@ TEMPLATES: Dict[str, str] = {
   </div>
   <p class="prompt"><strong>Prompt:</strong> {{ item.prompt_text }}</p>
   <div class="img-wrap">
-    <img src="{{ url_for('serve_img') }}?p={{ img_b64 }}" alt="image"/>
+    <img src="{{ url_for('serve_img') }}?i={{ img_id }}" alt="image"/>
   </div>
 
   <div class="field">
@@ -223,7 +230,7 @@ TEMPLATES: Dict[str, str] = {
   <div class="grid-2">
     {% for tile in display %}
     <div class="tile">
-      <img src="{{ url_for('serve_img') }}?p={{ tile.img_b64 }}" alt="candidate">
+      <img src="{{ url_for('serve_img') }}?i={{ tile.img_id }}" alt="candidate">
       <div class="rank-field">
         <label>Rank (1=best, 4=worst)</label>
         <select class="rank-select" name="rank_{{ tile.provider }}" required onchange="enforceUniqueRanks(this)">
@@ -260,7 +267,7 @@ TEMPLATES: Dict[str, str] = {
   <div class="grid-5">
     {% for im in images %}
       <div class="tile">
-        <img src="{{ url_for('serve_img') }}?p={{ im.img_b64 }}" alt="variant">
+        <img src="{{ url_for('serve_img') }}?i={{ im.img_id }}" alt="variant">
         <div class="seedlabel">seed {{ im.seed_label }}</div>
       </div>
     {% endfor %}
@@ -277,7 +284,7 @@ TEMPLATES: Dict[str, str] = {
   <input type="hidden" name="category_id" value="{{ cat }}">
   <input type="hidden" name="prompt_id" value="{{ prompt }}">
   <input type="hidden" id="elapsed_ms_c" name="elapsed_ms" value="0">
-  <input type="hidden" name="image_paths_json" value='{{ images | tojson }}'>
+  <input type="hidden" name="image_paths_json" value='{{ images_json or "[]" }}'>
 
   <div class="buttons">
     <button class="btn" type="submit">Submit & Next</button>
@@ -326,7 +333,7 @@ TEMPLATES: Dict[str, str] = {
     <h2>Overview</h2>
     <div>
       <button class="btn" onclick="reloadPools()">Reload Pools</button>
-      <a class="btn" href="{{ url_for('admin_export') }}">Export CSVs</a>
+      <a class="btn" href="{{ url_for('admin.export') }}">Export CSVs</a>
       <a class="btn" href="{{ url_for('admin_logout') }}">Logout</a>
     </div>
   </div>
@@ -456,7 +463,7 @@ function toLabels(arr, key="provider") {
 }
 
 function fetchStats() {
-  return fetch("{{ url_for('admin_stats') }}").then(r => r.json());
+  return fetch("{{ url_for('admin.stats') }}").then(r => r.json());
 }
 
 function pct(num, den) {
@@ -549,7 +556,7 @@ function updateCharts(data) {
 function fmt(n) { return n === null || n === undefined ? "—" : String(n); }
 
 async function refreshAll() {
-  const r = await fetch("{{ url_for('admin_stats') }}");
+  const r = await fetch("{{ url_for('admin.stats') }}");
   const js = await r.json();
   if (!js.ok) return;
 
@@ -625,7 +632,7 @@ function startPolling() {
 }
 
 async function reloadPools() {
-  const r = await fetch("{{ url_for('admin_reload') }}", { method: "POST" });
+  const r = await fetch("{{ url_for('admin.reload') }}", { method: "POST" });
   const js = await r.json();
   if (js.ok) {
     refreshAll();
@@ -739,50 +746,82 @@ storage:
   fallback_root: "C:\\Users\\ulugbek-pc\\Documents\\research\\survey_results"
 """
 
-def ensure_assets():
-    """Write templates/static if missing; create default config.yaml if missing."""
+def ensure_assets(force: bool = False):
+    """Write templates/static if missing; create default config.yaml if missing.
+
+    The per-file checks only run on a first start (no templates/static dir yet) or
+    with force=True; otherwise the checked-in files are used as they are.
+    """
     tpl_dir = APP_ROOT / "templates"
     st_dir = APP_ROOT / "static"
-    tpl_dir.mkdir(parents=True, exist_ok=True)
-    st_dir.mkdir(parents=True, exist_ok=True)
-    for name, content in TEMPLATES.items():
-        path = tpl_dir / name
-        if not path.exists():
-            path.write_text(content, encoding="utf-8")
-    for name, content in STATIC_FILES.items():
-        path = st_dir / name
-        if not path.exists():
-            path.write_text(content, encoding="utf-8")
+    if force or not tpl_dir.is_dir() or not st_dir.is_dir():
+        tpl_dir.mkdir(parents=True, exist_ok=True)
+        st_dir.mkdir(parents=True, exist_ok=True)
+        for name, content in TEMPLATES.items():
+            path = tpl_dir / name
+            if not path.exists():
+                path.write_text(content, encoding="utf-8")
+        for name, content in STATIC_FILES.items():
+            path = st_dir / name
+            if not path.exists():
+                path.write_text(content, encoding="utf-8")
     cfg_path = APP_ROOT / "config.yaml"
     if not cfg_path.exists():
         cfg_path.write_text(DEFAULT_CONFIG_YAML, encoding="utf-8")
 
-_seen_lock = threading.Lock()
-# Per-rater sets of keys for each module (lives only in RAM; cleared on restart)
-SEEN_A: DefaultDict[str, Set[tuple]] = defaultdict(set)  # (provider, category_id, prompt_id, seed_label)
-SEEN_B: DefaultDict[str, Set[tuple]] = defaultdict(set)  # (category_id, prompt_id, seed_label)
-SEEN_C: DefaultDict[str, Set[tuple]] = defaultdict(set)  # (provider, category_id, prompt_id)
+# Per-rater sets of keys for each module (lives only in RAM; cleared on restart):
+#   "A": (provider, category_id, prompt_id, seed_label)
+#   "B": (category_id, prompt_id, seed_label)
+#   "C": (provider, category_id, prompt_id)
+# Sharded by rater id so concurrent submits from different raters rarely share a lock.
+SEEN_SHARDS = 64  # power of two
+_SEEN: List[Tuple[threading.Lock, Dict[str, DefaultDict[str, Set[tuple]]]]] = [
+    (threading.Lock(), {m: defaultdict(set) for m in "ABC"}) for _ in range(SEEN_SHARDS)
+]
+
+def _seen_shard(rater_id: str) -> Tuple[threading.Lock, Dict[str, DefaultDict[str, Set[tuple]]]]:
+    return _SEEN[hash(rater_id) & (SEEN_SHARDS - 1)]
+
+def _mark_seen(module: str, rater_id: str, key: tuple):
+    lock, tables = _seen_shard(rater_id)
+    with lock:
+        tables[module][rater_id].add(key)
+
+def seen_keys(module: str, rater_id: str) -> Set[tuple]:
+    """Snapshot of the keys this rater already answered in `module` (copied under the shard lock)."""
+    lock, tables = _seen_shard(rater_id)
+    with lock:
+        return set(tables[module].get(rater_id, ()))
+
+def clear_seen(rater_id: str | None = None):
+    """Forget what one rater (or, with no id, every rater) has seen."""
+    shards = [_seen_shard(rater_id)] if rater_id is not None else _SEEN
+    for lock, tables in shards:
+        with lock:
+            for table in tables.values():
+                if rater_id is None:
+                    table.clear()
+                else:
+                    table.pop(rater_id, None)
 
 def mark_seen_a(rater_id: str, item: dict):
-    key = (item["provider"], item["category_id"], item["prompt_id"], int(item["seed_label"]))
-    with _seen_lock:
-        SEEN_A[rater_id].add(key)
+    _mark_seen("A", rater_id, (item["provider"], item["category_id"], item["prompt_id"], int(item["seed_label"])))
 
 def mark_seen_b(rater_id: str, cat: str, prompt: str, seed: int):
-    key = (cat, prompt, int(seed))
-    with _seen_lock:
-        SEEN_B[rater_id].add(key)
+    _mark_seen("B", rater_id, (cat, prompt, int(seed)))
 
 def mark_seen_c(rater_id: str, provider: str, cat: str, prompt: str):
-    key = (provider, cat, prompt)
-    with _seen_lock:
-        SEEN_C[rater_id].add(key)
-
+    _mark_seen("C", rater_id, (provider, cat, prompt))
 
 # ---------------------------- Config & storage ----------------------------
 
+def env_flag(name: str, default: bool = False) -> bool:
+    """Boolean environment switch: 1/true/yes (any case) turn it on; unset means `default`."""
+    v = os.getenv(name)
+    return default if v is None else v.strip().lower() in ("1", "true", "yes")
+
 load_dotenv(APP_ROOT / ".env")
-ensure_assets()
+ensure_assets(force=env_flag("WRITE_BUNDLED_ASSETS"))
 
 def read_yaml(path: Path) -> dict:
     with open(path, "r", encoding="utf-8") as f:
@@ -807,6 +846,7 @@ PREPEND_TEXT = (
     "the style of any living artist or copyrighted characters. "
 )
 
+@lru_cache(maxsize=4096)  # prompts come from a small closed pool and repeat across raters
 def split_prompt(full: str) -> tuple[str, str]:
     """Return (prepend, core). If full doesn't start with prepend, core==full."""
     full = full or ""
@@ -826,17 +866,52 @@ if not STORAGE_ROOT.exists():
 
 DB_PATH = STORAGE_ROOT / "db" / "survey.sqlite"
 EXPORT_DIR = STORAGE_ROOT / "exports"
+JINJA_CACHE_DIR = STORAGE_ROOT / "jinja_cache"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # ---------------------------- Flask app ----------------------------
 
+class OrjsonProvider(DefaultJSONProvider):
+    """app.json backed by orjson. Flask routes jsonify(), |tojson and the session cookie
+    serializer through app.json, so all three pick this up. Datetimes, dataclasses etc.
+    still go through DefaultJSONProvider.default so their output is unchanged."""
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = self._OPTIONS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Let Apache mod_xsendfile / lighttpd stream files handed out by send_file().
+app.config["USE_X_SENDFILE"] = env_flag("USE_X_SENDFILE")
+# Behind nginx: /img only validates the path and hands the transfer back via X-Accel-Redirect
+# to an internal location per provider, e.g. `location /_protected_img/chatgpt/ { internal; alias E:/research/chatgpt/; }`.
+app.config["USE_X_ACCEL"] = env_flag("USE_X_ACCEL")
+app.config["X_ACCEL_PREFIX"] = "/" + os.getenv("X_ACCEL_PREFIX", "/_protected_img").strip("/")
 app.secret_key = os.getenv("FLASK_SECRET", "".join(random.choices(string.ascii_letters + string.digits, k=32)))
+# Templates don't change while the process runs: keep every parsed template for the
+# process lifetime (no mtime checks, no LRU eviction) and persist compiled bytecode
+# so restarts skip the compile step too.
+app.jinja_options = {
+    **app.jinja_options,
+    "auto_reload": False,
+    "cache_size": -1,
+    "bytecode_cache": FileSystemBytecodeCache(str(JINJA_CACHE_DIR)),
+}
 
 # ---------------------------- Data structures ----------------------------
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ManifestRow:
     provider: str
     model: str
@@ -853,21 +928,65 @@ class ManifestRow:
     w: int | None
     h: int | None
     completed_utc: str
+    completed_ts: int = 0  # completed_utc as epoch seconds (0 if missing/unparseable)
+    img_id: str = ""     # /img?i= id, see image_id()
 
 ALL_A_IMAGES: List[ManifestRow] = []
+A_BY_KEY: Dict[Tuple[str, str, str, int], ManifestRow] = {}  # (provider, category_id, prompt_id, seed_label) -> row
+A_KEYS: List[Tuple[str, str, str, int]] = []  # A_BY_KEY keys, for sampling by position
+A_INDEX: Dict[tuple, int] = {}                # A_BY_KEY key -> its position in A_KEYS
 B_SETS: Dict[Tuple[str, str, int], Dict[str, ManifestRow]] = {}
+B_KEYS: List[Tuple[str, str, int]] = []       # B_SETS keys, for sampling by position
+B_INDEX: Dict[tuple, int] = {}                # B_SETS key -> its position in B_KEYS
 C_SETS: List[Tuple[str, str, str, List[ManifestRow]]] = []
+C_BY_KEY: Dict[Tuple[str, str, str], List[ManifestRow]] = {}  # (provider, category_id, prompt_id) -> rows in SEED_LABELS order
+C_KEYS: List[Tuple[str, str, str]] = []       # C_BY_KEY keys, for sampling by position
+C_INDEX: Dict[tuple, int] = {}                # C_BY_KEY key -> its position in C_KEYS
 ALLOWED_IMAGE_BASES: List[Path] = []
+ROOT_PROVIDER: Dict[str, str] = {}     # normcase'd provider root (as configured and resolved) + os.sep -> provider
+IMG_BY_ID: Dict[str, Path] = {}        # img_id -> image path; the only files /img will serve
+C_IMAGES_JSON: Dict[Tuple[str, str, str], Markup] = {}  # C_BY_KEY key -> image_paths_json field value
 
 # ---------------------------- DB helpers ----------------------------
 
-def db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+# Reads go through a small pool of long-lived connections (opened and tuned once);
+# all inserts go through the single writer connection below.
+READ_POOL_SIZE = 4
+_read_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+
+def apply_pragmas(conn: sqlite3.Connection):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+    apply_pragmas(conn)
     return conn
 
+@contextmanager
+def get_conn():
+    """Borrow a pooled read connection (Row factory); opens another if all are in use."""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = connect()
+        conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _read_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
 def init_db():
-    conn = db(); cur = conn.cursor()
+    conn = connect(); cur = conn.cursor()
     cur.execute("""
     CREATE TABLE IF NOT EXISTS raters(
       rater_id TEXT PRIMARY KEY,
@@ -904,7 +1023,152 @@ def init_db():
       image_paths_json TEXT,
       elapsed_ms INTEGER, submitted_utc TEXT
     );""")
-    conn.commit(); conn.close()
+    conn.close()
+
+# ---------------------------- DB writer ----------------------------
+
+# Inserts are queued by the request handlers and written by a single background
+# thread, many rows per transaction, so a submit never waits on its own fsync.
+WRITE_BATCH_MAX = 256      # rows per transaction
+WRITE_FLUSH_SEC = 0.2      # max time a queued row waits before it is committed
+WRITE_RETRIES = 5          # attempts while another process holds the write lock past busy_timeout
+EXPORT_FLUSH_SEC = 5.0     # how long an export waits for queued rows before going ahead without them
+SHUTDOWN_FLUSH_SEC = 10.0  # same, at process exit (stays under gunicorn's graceful timeout)
+
+INSERT_SQL: Dict[str, str] = {
+    "R": "INSERT OR IGNORE INTO raters(rater_id, created_utc, user_agent) VALUES(?,?,?)",
+    "A": """
+        INSERT INTO responses_a(
+          rater_id, provider, model, category_id, prompt_id, seed_label,
+          image_path, prompt_text, has_text, no_people,
+          adherence, aesthetic, creativity, style,
+          text_correctness, people_violation, elapsed_ms, submitted_utc
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """,
+    "B": """
+        INSERT INTO responses_b(
+          rater_id, category_id, prompt_id, seed_label,
+          rank_chatgpt, rank_google, rank_stability, rank_bfl,
+          image_chatgpt, image_google, image_stability, image_bfl,
+          elapsed_ms, submitted_utc
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """,
+    "C": """
+        INSERT INTO responses_c(
+          rater_id, provider, category_id, prompt_id, diversity,
+          image_paths_json, elapsed_ms, submitted_utc
+        ) VALUES (?,?,?,?,?,?,?,?)
+    """,
+}
+
+_write_q: "queue.Queue[Tuple[str, tuple]]" = queue.Queue(maxsize=10000)
+_writer_thread: threading.Thread | None = None
+
+def enqueue_write(kind: str, row: tuple):
+    """Queue one row for INSERT_SQL[kind]; blocks only if the writer is far behind."""
+    _write_q.put((kind, row))
+
+def _write_batch(conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]):
+    by_kind: DefaultDict[str, List[tuple]] = defaultdict(list)
+    for kind, row in batch:
+        by_kind[kind].append(row)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for kind in INSERT_SQL:  # raters first
+            if by_kind.get(kind):
+                conn.executemany(INSERT_SQL[kind], by_kind[kind])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _requeue(batch: List[Tuple[str, tuple]]):
+    """Put a batch back behind the queued rows; whatever doesn't fit is dropped (and logged)."""
+    for n, item in enumerate(batch):
+        try:
+            _write_q.put_nowait(item)
+        except queue.Full:
+            app.logger.error("DB writer: queue full, dropped %d rows", len(batch) - n)
+            return
+
+def _commit_batch(conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]):
+    """Write a batch, retrying while the DB is locked (and requeueing it if the lock outlasts
+    the retries); on any other error fall back to one row per transaction so a single bad
+    row doesn't lose the whole batch."""
+    for attempt in range(WRITE_RETRIES):
+        try:
+            _write_batch(conn, batch)
+            return
+        except sqlite3.OperationalError as e:
+            err = e
+            if "locked" not in str(e) and "busy" not in str(e):
+                break
+            if attempt + 1 == WRITE_RETRIES:
+                # every row-by-row BEGIN would wait out busy_timeout too; try again later instead
+                app.logger.error("DB writer: database still busy, requeueing batch of %d rows", len(batch))
+                _requeue(batch)
+                return
+            app.logger.warning("DB writer: database busy, retrying batch of %d rows", len(batch))
+            time.sleep(0.5 * (attempt + 1))
+        except Exception as e:
+            err = e
+            break
+    if len(batch) == 1:
+        app.logger.error("DB writer: dropped a %s row", batch[0][0], exc_info=err)
+        return
+    app.logger.error("DB writer: batch of %d rows failed; writing rows one by one", len(batch), exc_info=err)
+    for item in batch:
+        try:
+            _write_batch(conn, [item])
+        except Exception:
+            app.logger.exception("DB writer: dropped a %s row", item[0])
+
+def _writer_loop():
+    conn = connect()
+    while True:
+        batch = [_write_q.get()]
+        deadline = time.monotonic() + WRITE_FLUSH_SEC
+        while len(batch) < WRITE_BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_write_q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            _commit_batch(conn, batch)
+        finally:
+            for _ in batch:
+                _write_q.task_done()
+        try:
+            refresh_stats(conn)
+        except Exception:
+            app.logger.exception("DB writer: stats refresh failed")
+
+def flush_writes(timeout: float) -> int:
+    """Wait up to `timeout` seconds for queued rows to be committed; returns how many are still pending.
+
+    Bounded on purpose: under steady traffic, or while a busy DB keeps a batch requeued, the
+    queue may never drain completely."""
+    if _writer_thread is None or not _writer_thread.is_alive():
+        return 0
+    with _write_q.all_tasks_done:
+        _write_q.all_tasks_done.wait_for(lambda: not _write_q.unfinished_tasks, timeout)
+        return _write_q.unfinished_tasks
+
+def _flush_at_exit():
+    pending = flush_writes(SHUTDOWN_FLUSH_SEC)
+    if pending:
+        app.logger.error("DB writer: exiting with %d rows not yet written", pending)
+
+def start_db_writer():
+    global _writer_thread
+    if _writer_thread is not None:
+        return
+    _writer_thread = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+    _writer_thread.start()
+    atexit.register(_flush_at_exit)
 
 # ---------------------------- Manifest loading ----------------------------
 
@@ -918,20 +1182,20 @@ def _normalize_image_path(path_str: str, provider_root: Path) -> Path:
       - else, as a last resort use basename under provider_root/images
     """
     s = str(path_str or "").strip().replace("\\", "/")
+    s_low = s.lower()
     prov = provider_root.name.lower()
     # /chatgpt/... or /flux/... etc.
-    m1 = s.lower().find("/" + prov + "/")
+    m1 = s_low.find("/" + prov + "/")
     if m1 != -1:
         return provider_root / s[m1 + len(prov) + 2:]  # skip '/<prov>/'
     # /images/...
-    m2 = s.lower().find("/images/")
+    m2 = s_low.find("/images/")
     if m2 != -1:
         return provider_root / s[m2+1:]  # drop leading slash
     # relative path
     if not s.startswith("/"):
         return provider_root / s
     # fallback to basename in images/
-    from pathlib import PurePath
     return provider_root / "images" / PurePath(s).name
 
 
@@ -942,6 +1206,29 @@ def try_int(x: str) -> int | None:
     try: return int(x)
     except Exception: return None
 
+def utc_ts(x: str) -> int:
+    """ISO-8601 timestamp -> epoch seconds; naive values are taken as UTC, bad/empty ones give 0."""
+    try:
+        dt = datetime.fromisoformat(x.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def _image_exists(p: Path, listings: Dict[str, Set[str]]) -> bool:
+    """p.exists(), answered from one scandir() per directory (cached in `listings`)."""
+    d = os.path.normcase(str(p.parent))
+    names = listings.get(d)
+    if names is None:
+        try:
+            with os.scandir(d) as it:
+                names = {os.path.normcase(e.name) for e in it}
+        except OSError:
+            names = set()
+        listings[d] = names
+    return os.path.normcase(p.name) in names
+
 def read_latest_manifest(provider: str, base_dir: Path) -> List[ManifestRow]:
     man_dir = base_dir / "manifests"
     if not man_dir.exists(): return []
@@ -951,106 +1238,182 @@ def read_latest_manifest(provider: str, base_dir: Path) -> List[ManifestRow]:
     csv_path = latest / "manifest.csv"
     if not csv_path.exists(): return []
     rows: List[ManifestRow] = []
+    listings: Dict[str, Set[str]] = {}
     with open(csv_path, "r", encoding="utf-8", newline="") as f:
-        rd = csv.DictReader(f)
+        # Plain csv.reader + header indices: no per-row dict, and the status/size
+        # filters look at raw cells before anything else is parsed.
+        rd = csv.reader(f)
+        header = next(rd, [])
+        width = len(header)
+        col = {name: i for i, name in enumerate(header)}
+        # A missing column maps to index `width`, the "" every row is padded with below.
+        (i_model, i_run, i_cat, i_prompt, i_seed, i_img, i_text, i_has_text,
+         i_expected, i_no_people, i_status, i_w, i_h, i_completed) = (
+            col.get(name, width) for name in (
+                "model", "run_id", "category_id", "prompt_id", "seed", "image_path", "prompt_text",
+                "has_text", "expected_texts", "no_people", "status", "full_w", "full_h",
+                "request_completed_utc"))
         for r in rd:
-            if STATUS_OK_ONLY and r.get("status","") != "ok": continue
-            w = try_int(r.get("full_w","") or "")
-            h = try_int(r.get("full_h","") or "")
+            if not r: continue  # blank line (DictReader skipped these)
+            if len(r) == width:
+                r.append("")
+            else:
+                r = r[:width] + [""] * (width + 1 - min(len(r), width))
+            if STATUS_OK_ONLY and r[i_status] != "ok": continue
+            w = try_int(r[i_w])
+            h = try_int(r[i_h])
             if REQUIRE_1K_SQUARE and not (w == 1024 and h == 1024): continue
-            seed_label = try_int(r.get("seed","") or "") or 0
-            img_path = _normalize_image_path(r.get("image_path",""), base_dir)
+            seed_label = try_int(r[i_seed]) or 0
+            img_path = _normalize_image_path(r[i_img], base_dir)
+            if not _image_exists(img_path, listings): continue
             rows.append(ManifestRow(
                 provider=provider,
-                model=r.get("model",""),
-                run_id=r.get("run_id",""),
-                category_id=str(r.get("category_id","")).strip(),
-                prompt_id=str(r.get("prompt_id","")).strip(),
+                model=r[i_model],
+                run_id=r[i_run],
+                category_id=r[i_cat].strip(),
+                prompt_id=r[i_prompt].strip(),
                 seed_label=seed_label,
                 image_path=img_path,
-                prompt_text=r.get("prompt_text",""),
-                has_text=parse_bool(r.get("has_text","false")),
-                expected_texts=r.get("expected_texts",""),
-                no_people=parse_bool(r.get("no_people","false")),
-                status=r.get("status",""),
+                prompt_text=r[i_text],
+                has_text=parse_bool(r[i_has_text]),
+                expected_texts=r[i_expected],
+                no_people=parse_bool(r[i_no_people]),
+                status=r[i_status],
                 w=w, h=h,
-                completed_utc=r.get("request_completed_utc","")
+                completed_utc=r[i_completed],
+                completed_ts=utc_ts(r[i_completed]),
+                img_id=image_id(img_path),
             ))
-    return [r for r in rows if r.image_path.exists()]
+    return rows
+
+_build_lock = threading.Lock()
+_tasks_ready = threading.Event()  # set once the first build has finished (or failed)
+
+def rebuild_tasks():
+    """build_tasks(), one build at a time (startup thread vs. admin reload)."""
+    with _build_lock:
+        build_tasks()
+
+def _build_tasks_in_background():
+    try:
+        rebuild_tasks()
+    except Exception:
+        app.logger.exception("Building task pools failed")
+    finally:
+        _tasks_ready.set()
+
+def _index_by_key(keys) -> Dict[tuple, int]:
+    return {key: i for i, key in enumerate(keys)}
 
 def build_tasks():
-    global ALL_A_IMAGES, B_SETS, C_SETS, ALLOWED_IMAGE_BASES
-    ALL_A_IMAGES = []
+    global ALL_A_IMAGES, A_BY_KEY, A_KEYS, A_INDEX, B_SETS, B_KEYS, B_INDEX, C_SETS, C_BY_KEY, C_KEYS, C_INDEX
+    global C_IMAGES_JSON, ALLOWED_IMAGE_BASES, ROOT_PROVIDER, IMG_BY_ID
+    all_a: List[ManifestRow] = []
     per_provider: Dict[str, List[ManifestRow]] = {}
     ALLOWED_IMAGE_BASES = []
-    for prov, root in PROVIDER_DIRS.items():
-        rows = read_latest_manifest(prov, root)
+    # Manifests are independent and mostly disk-bound (reads + directory scans): load them side by side
+    with ThreadPoolExecutor(max_workers=max(1, len(PROVIDER_DIRS)), thread_name_prefix="manifest") as ex:
+        loaded = list(ex.map(read_latest_manifest, PROVIDER_DIRS.keys(), PROVIDER_DIRS.values()))
+    for (prov, root), rows in zip(PROVIDER_DIRS.items(), loaded):
         per_provider[prov] = rows
-        ALL_A_IMAGES.extend(rows)
+        all_a.extend(rows)
         ALLOWED_IMAGE_BASES.append(root.resolve())
-
-    # Build B sets: keys present across all providers
-    B_SETS = {}
-    providers = list(PROVIDER_DIRS.keys())
+    # Image paths are built from the configured roots; keep the resolved form too in case they're symlinked
+    roots: Dict[str, str] = {}
+    for prov, base in (*PROVIDER_DIRS.items(), *zip(PROVIDER_DIRS, ALLOWED_IMAGE_BASES)):
+        roots.setdefault(os.path.normcase(os.path.normpath(str(base))) + os.sep, prov)
+    ROOT_PROVIDER = roots
+    IMG_BY_ID = {r.img_id: r.image_path for r in all_a}
+    # Newest row per (provider, category, prompt, seed); every part draws from these, so a retried
+    # image shows the same file in A, B and C
     idx: Dict[str, Dict[Tuple[str,str,int], ManifestRow]] = {}
     for prov, rows in per_provider.items():
         d: Dict[Tuple[str,str,int], ManifestRow] = {}
         for r in rows:
             key = (r.category_id, r.prompt_id, r.seed_label)
             keep = d.get(key)
-            if not keep or (r.completed_utc > keep.completed_utc):
+            if not keep or (r.completed_ts > keep.completed_ts):
                 d[key] = r
         idx[prov] = d
+    a_by_key = {(prov, *key): r for prov, d in idx.items() for key, r in d.items()}
+    # Publish each pool together with its key list and index; plans in the session only hold keys
+    ALL_A_IMAGES, A_BY_KEY, A_KEYS, A_INDEX = all_a, a_by_key, list(a_by_key), _index_by_key(a_by_key)
+
+    # Build B sets: keys present across all providers
+    b_sets: Dict[Tuple[str, str, int], Dict[str, ManifestRow]] = {}
+    providers = list(PROVIDER_DIRS.keys())
     keys_all = None
     for prov in providers:
         keys = set(idx[prov].keys())
         keys_all = keys if keys_all is None else keys_all & keys
     if keys_all:
         for key in keys_all:
-            B_SETS[key] = {prov: idx[prov][key] for prov in providers}
+            b_sets[key] = {prov: idx[prov][key] for prov in providers}
+    B_SETS, B_KEYS, B_INDEX = b_sets, list(b_sets), _index_by_key(b_sets)
 
     # Build C sets: per provider, for each (cat,prompt) need all seed labels
-    C_SETS = []
-    for prov, rows in per_provider.items():
+    c_sets: List[Tuple[str, str, str, List[ManifestRow]]] = []
+    for prov, d in idx.items():
         group: Dict[Tuple[str,str], Dict[int, ManifestRow]] = {}
-        for r in rows:
+        for r in d.values():
             gp = (r.category_id, r.prompt_id)
             group.setdefault(gp, {})[r.seed_label] = r
         for (cat,prompt), m in group.items():
             if all(s in m for s in SEED_LABELS):
                 ordered = [m[s] for s in SEED_LABELS]
-                C_SETS.append((prov, cat, prompt, ordered))
+                c_sets.append((prov, cat, prompt, ordered))
+    c_by_key = {(prov, cat, prompt): rows for prov, cat, prompt, rows in c_sets}
+    C_IMAGES_JSON = {key: images_json(str(r.image_path) for r in rows) for key, rows in c_by_key.items()}
+    C_SETS, C_BY_KEY, C_KEYS, C_INDEX = c_sets, c_by_key, list(c_by_key), _index_by_key(c_by_key)
+
+def images_json(paths) -> Markup:
+    """JSON list of paths, escaped like Jinja's |tojson so it is safe inside an HTML attribute."""
+    s = orjson.dumps(list(paths)).decode("utf-8")
+    return Markup(s.replace("&", "\\u0026").replace("<", "\\u003c")
+                  .replace(">", "\\u003e").replace("'", "\\u0027"))
 
 # ---------------------------- Image serving ----------------------------
 
-def encode_path(p: Path) -> str:
-    return base64.urlsafe_b64encode(str(p).encode("utf-8")).decode("ascii")
+def image_id(p: Path) -> str:
+    """Short, stable id for an image path: the same in every worker and across restarts."""
+    return hashlib.blake2b(str(p).encode("utf-8"), digest_size=8).hexdigest()
 
-def decode_path(s: str) -> Path:
-    return Path(base64.urlsafe_b64decode(s.encode("ascii")).decode("utf-8"))
+def accel_uri(p: Path) -> str | None:
+    """Internal nginx URI for an allowed image: <X_ACCEL_PREFIX>/<provider>/<path under its root>."""
+    norm = os.path.normpath(str(p))
+    key = os.path.normcase(norm)  # same length as norm, so offsets carry over
+    for root, prov in ROOT_PROVIDER.items():
+        if key.startswith(root):
+            rel = norm[len(root):].replace(os.sep, "/")
+            return f"{app.config['X_ACCEL_PREFIX']}/{quote(prov)}/{quote(rel)}"
+    return None
 
-def is_under_allowed_bases(p: Path) -> bool:
-    try:
-        rp = p.resolve(strict=False)
-        for base in ALLOWED_IMAGE_BASES:
-            try:
-                rp.relative_to(base)
-                return True
-            except Exception:
-                continue
-        return False
-    except Exception:
-        return False
+IMG_MAX_AGE = 31536000  # a URL names one file on disk, so browsers can keep it for a year
 
 @app.get("/img")
 def serve_img():
-    b64 = request.args.get("p","").strip()
-    if not b64: abort(400)
-    p = decode_path(b64)
-    if not is_under_allowed_bases(p): abort(403)
-    if not p.exists(): abort(404)
-    # Heuristic: default to PNG, but let Flask sniff if needed
-    return send_file(p, mimetype="image/png")
+    img_id = request.args.get("i","").strip()
+    if not img_id: abort(400)
+    p = IMG_BY_ID.get(img_id)  # only images from the loaded manifests are served
+    if p is None: abort(404)
+    if app.config["USE_X_ACCEL"]:
+        uri = accel_uri(p)
+        if uri is None: abort(403)
+        resp = app.response_class(mimetype="image/png")
+        resp.headers["X-Accel-Redirect"] = uri  # nginx streams the file (and 404s if it's gone)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = IMG_MAX_AGE
+        resp.cache_control.immutable = True
+        return resp
+    # conditional=True answers If-None-Match/If-Modified-Since/Range; the body goes out
+    # through wsgi.file_wrapper (sendfile) or X-Sendfile when USE_X_SENDFILE is on.
+    try:
+        resp = send_file(p, mimetype="image/png", conditional=True, etag=True, max_age=IMG_MAX_AGE)
+    except FileNotFoundError:
+        abort(404)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
 
 # ---------------------------- Rater & plans ----------------------------
 
@@ -1059,19 +1422,9 @@ def get_or_create_rater() -> str:
     if not rid:
         rid = str(uuid.uuid4())
         session["rater_id"] = rid
-        conn = db()
-        conn.execute("INSERT OR IGNORE INTO raters(rater_id, created_utc, user_agent) VALUES(?,?,?)",
-                     (rid, datetime.utcnow().isoformat()+"Z", request.headers.get("User-Agent","")))
-        conn.commit(); conn.close()
+        enqueue_write("R", (rid, datetime.utcnow().isoformat()+"Z", request.headers.get("User-Agent","")))
     return rid
 
-def slim_asdict_mr(m: ManifestRow) -> dict:
-    d = asdict_mr(m)
-    # drop heavy fields so the cookie stays < 4 KB
-    d["prompt_text"] = ""         # template will rehydrate when rendering
-    return d
-
-
 def asdict_mr(m: ManifestRow) -> dict:
     return {
         "provider": m.provider, "model": m.model, "run_id": m.run_id,
@@ -1082,6 +1435,23 @@ def asdict_mr(m: ManifestRow) -> dict:
         "w": m.w or "", "h": m.h or "", "completed_utc": m.completed_utc
     }
 
+def sample_unseen(n: int, k: int, excluded: Set[int]) -> List[int]:
+    """Up to k random indices from range(n) not in `excluded`, in random order.
+
+    Draws k + len(excluded) indices and drops the excluded ones, so the cost is
+    O(k + seen) instead of a pass over the whole pool.
+    """
+    k = min(k, n - len(excluded))
+    if k <= 0:
+        return []
+    drawn = random.sample(range(n), min(n, k + len(excluded)))
+    return [i for i in drawn if i not in excluded][:k]
+
+def advance_plan(module_id: str):
+    """Move this rater's progress in `module_id` one entry along the plan."""
+    idx_all = session.get("plan_idx", {"A":0,"B":0,"C":0}); idx_all[module_id] = idx_all.get(module_id,0) + 1
+    session["plan_idx"] = idx_all
+
 def sample_plan_for_rater(rater_id: str, overrides: dict | None = None) -> dict:
     random.seed()
     plan: Dict[str, Any] = {"A": [], "B": [], "C": []}
@@ -1091,49 +1461,54 @@ def sample_plan_for_rater(rater_id: str, overrides: dict | None = None) -> dict:
     tgtC = int(MODULE_ITEMS.get("C", 12))
 
     # ---- filter A by unseen ----
-    seen_a = SEEN_A.get(rater_id, set())
-    pool_a = [m for m in ALL_A_IMAGES
-              if (m.provider, m.category_id, m.prompt_id, m.seed_label) not in seen_a]
-    kA = min(tgtA, len(pool_a))
-    plan["A"] = random.sample(pool_a, kA) if kA > 0 and len(pool_a) >= kA else pool_a[:kA]
+    seen_a = seen_keys("A", rater_id)
+    keys_a, index_a = A_KEYS, A_INDEX
+    excluded_a = {index_a[key] for key in seen_a if key in index_a}
+    plan["A"] = [keys_a[i] for i in sample_unseen(len(keys_a), tgtA, excluded_a)]
 
     # ---- filter B by unseen ----
-    seen_b = SEEN_B.get(rater_id, set())
-    pool_b_keys = [key for key in B_SETS.keys() if key not in seen_b]
-    random.shuffle(pool_b_keys)
-    kB = min(tgtB, len(pool_b_keys))
-    plan["B"] = pool_b_keys[:kB]
+    seen_b = seen_keys("B", rater_id)
+    keys_b, index_b = B_KEYS, B_INDEX
+    excluded_b = {index_b[key] for key in seen_b if key in index_b}
+    plan["B"] = [keys_b[i] for i in sample_unseen(len(keys_b), tgtB, excluded_b)]
 
     # ---- filter C by unseen ----
-    seen_c = SEEN_C.get(rater_id, set())
-    pool_c = [(prov, cat, prompt, rows)
-              for (prov, cat, prompt, rows) in C_SETS
-              if (prov, cat, prompt) not in seen_c]
-    kC = min(tgtC, len(pool_c))
-    plan["C"] = random.sample(pool_c, kC) if kC > 0 and len(pool_c) >= kC else pool_c[:kC]
-
-    # store slim plan (unchanged)
+    seen_c = seen_keys("C", rater_id)
+    keys_c, index_c = C_KEYS, C_INDEX
+    excluded_c = {index_c[key] for key in seen_c if key in index_c}
+    plan["C"] = [keys_c[i] for i in sample_unseen(len(keys_c), tgtC, excluded_c)]
+
+    # store the plan as keys only (rows are looked up when rendered), so the cookie stays small
     session["plan_idx"] = {"A": 0, "B": 0, "C": 0}
     session["plan_sizes"] = {"A": len(plan["A"]), "B": len(plan["B"]), "C": len(plan["C"])}
-    session["plan"] = {
-        "A": [slim_asdict_mr(m) for m in plan["A"]],
-        "B": plan["B"],
-        "C": [(prov, cat, prompt, [slim_asdict_mr(x) for x in rows]) for (prov,cat,prompt,rows) in plan["C"]]
-    }
+    session["plan"] = plan
     return session["plan"]
 
-def hydrate_prompt_text(item: dict) -> dict:
-    # find original in ALL_A_IMAGES by keys; fill prompt_text if blank
-    if item.get("prompt_text"):
-        return item
-    for r in ALL_A_IMAGES:
-        if (r.provider == item["provider"] and
-            r.category_id == item["category_id"] and
-            r.prompt_id == item["prompt_id"] and
-            r.seed_label == item["seed_label"]):
-            item["prompt_text"] = r.prompt_text
+def plan_key(item) -> tuple:
+    """Pool key of a plan entry; also accepts entries from plans stored before keys-only sessions."""
+    if isinstance(item, dict):
+        return (item["provider"], item["category_id"], item["prompt_id"], int(item["seed_label"]))
+    return tuple(item[:3]) if len(item) == 4 and isinstance(item[3], list) else tuple(item)
+
+def resolve_plan_item(plan: dict, module_id: str, idx: int, total: int, lookup) -> Tuple[int, tuple | None, Any]:
+    """(idx, key, rows) for the first plan entry from `idx` on that `lookup` still finds, stepping
+    plan_idx past entries whose rows are gone (pools reloaded since the plan was sampled).
+    rows is None once the module has run out of entries."""
+    start, key, rows = idx, None, None
+    while idx < total:
+        key = plan_key(plan[module_id][idx])
+        rows = lookup(key)
+        if rows is not None:
             break
-    return item
+        idx += 1
+    if idx != start:
+        idx_all = session.get("plan_idx", {"A":0,"B":0,"C":0}); idx_all[module_id] = idx
+        session["plan_idx"] = idx_all
+    return idx, key, rows
+
+def _c_item(key: tuple) -> Tuple[List[ManifestRow], Markup] | None:
+    rows, paths_json = C_BY_KEY.get(key), C_IMAGES_JSON.get(key)
+    return None if rows is None or paths_json is None else (rows, paths_json)
 
 
 # ---------------------------- Admin auth & stats ----------------------------
@@ -1141,113 +1516,309 @@ def hydrate_prompt_text(item: dict) -> dict:
 def is_admin() -> bool:
     return bool(session.get("is_admin") is True)
 
-def require_admin(view_func):
-    @wraps(view_func)
-    def wrapper(*args, **kwargs):
-        if not is_admin():
-            return redirect(url_for("admin_login", next=request.path))
-        return view_func(*args, **kwargs)
-    return wrapper
-
-def _fetchone_val(conn, sql, params=()):
-    cur = conn.execute(sql, params); row = cur.fetchone()
-    return (row[0] if row and len(row) else 0)
+# Dashboard aggregates are kept in memory and folded in incrementally: each table is
+# read only past the highest id already counted, so a refresh costs O(new rows).
+# The writer refreshes right after each commit; admin reads refresh too, which
+# also picks up rows committed by other worker processes.
+B_PROVIDERS = ("chatgpt", "google", "stability", "bfl")
+A_METRICS = ("adherence", "aesthetic", "creativity", "style")
+TEXT_LABELS = ("correct", "partial", "incorrect")
+RECENT_N = 10
+
+_stats_lock = threading.Lock()
+_stats_changed = threading.Condition(_stats_lock)  # notified whenever _stats_version advances
+_stats_version = 0
+_stats_body: Tuple[tuple, str, bytes] | None = None
+
+def _new_stats() -> Dict[str, Any]:
+    return {
+        "last_id": {"R": 0, "A": 0, "B": 0, "C": 0},
+        "raters": 0,
+        "A": {},  # provider -> running sums/counts
+        "B": {"n": 0,
+              "rank_sum": dict.fromkeys(B_PROVIDERS, 0),
+              "rank_n": dict.fromkeys(B_PROVIDERS, 0),
+              "wins": dict.fromkeys(B_PROVIDERS, 0)},
+        "C": {},  # provider -> {"n", "sum"}
+        "recent": {m: deque(maxlen=RECENT_N) for m in "ABC"},
+    }
 
-def _fetchall_dicts(conn, sql, params=()):
-    cur = conn.execute(sql, params)
-    cols = [d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in cur.fetchall()]
+STATS: Dict[str, Any] = _new_stats()
 
-def get_stats() -> dict:
-    pools = {"pool_A": len(ALL_A_IMAGES), "pool_B": len(B_SETS), "pool_C": len(C_SETS)}
-    conn = db()
-    total_raters = _fetchone_val(conn, "SELECT COUNT(*) FROM raters")
-    A_total = _fetchone_val(conn, "SELECT COUNT(*) FROM responses_a")
-    B_total = _fetchone_val(conn, "SELECT COUNT(*) FROM responses_b")
-    C_total = _fetchone_val(conn, "SELECT COUNT(*) FROM responses_c")
-
-    A_mos = _fetchall_dicts(conn, """
-      SELECT provider,
-             COUNT(*) AS n,
-             ROUND(AVG(adherence),2) AS adherence,
-             ROUND(AVG(aesthetic),2) AS aesthetic,
-             ROUND(AVG(creativity),2) AS creativity,
-             ROUND(AVG(style),2) AS style
-      FROM responses_a
-      GROUP BY provider
-      ORDER BY provider
-    """)
-    A_text = _fetchall_dicts(conn, """
-      SELECT provider,
-             SUM(CASE WHEN text_correctness='correct' THEN 1 ELSE 0 END) AS correct,
-             SUM(CASE WHEN text_correctness='partial' THEN 1 ELSE 0 END) AS partial,
-             SUM(CASE WHEN text_correctness='incorrect' THEN 1 ELSE 0 END) AS incorrect
-      FROM responses_a
-      WHERE text_correctness IS NOT NULL AND text_correctness <> ''
-      GROUP BY provider
-      ORDER BY provider
-    """)
-    A_people = _fetchall_dicts(conn, """
-      SELECT provider,
-             SUM(CASE WHEN no_people=1 THEN 1 ELSE 0 END) AS with_rule,
-             SUM(CASE WHEN no_people=1 AND people_violation=1 THEN 1 ELSE 0 END) AS violations
-      FROM responses_a
-      GROUP BY provider
-      ORDER BY provider
-    """)
-    B_rank = _fetchall_dicts(conn, """
-      SELECT 'chatgpt' AS provider, COUNT(*) AS n,
-             ROUND(AVG(rank_chatgpt),2) AS avg_rank,
-             SUM(CASE WHEN rank_chatgpt=1 THEN 1 ELSE 0 END) AS wins
-      FROM responses_b
-      UNION ALL
-      SELECT 'google', COUNT(*), ROUND(AVG(rank_google),2),
-             SUM(CASE WHEN rank_google=1 THEN 1 ELSE 0 END)
-      FROM responses_b
-      UNION ALL
-      SELECT 'stability', COUNT(*), ROUND(AVG(rank_stability),2),
-             SUM(CASE WHEN rank_stability=1 THEN 1 ELSE 0 END)
-      FROM responses_b
-      UNION ALL
-      SELECT 'bfl', COUNT(*), ROUND(AVG(rank_bfl),2),
-             SUM(CASE WHEN rank_bfl=1 THEN 1 ELSE 0 END)
-      FROM responses_b
-    """)
-    C_div = _fetchall_dicts(conn, """
-      SELECT provider,
-             COUNT(*) AS n,
-             ROUND(AVG(diversity),2) AS avg_diversity
-      FROM responses_c
-      GROUP BY provider
-      ORDER BY provider
-    """)
-    recent_a = _fetchall_dicts(conn, """
-      SELECT submitted_utc, rater_id, provider, category_id, prompt_id, seed_label
-      FROM responses_a ORDER BY id DESC LIMIT 10
-    """)
-    recent_b = _fetchall_dicts(conn, """
-      SELECT submitted_utc, rater_id, category_id, prompt_id, seed_label
-      FROM responses_b ORDER BY id DESC LIMIT 10
-    """)
-    recent_c = _fetchall_dicts(conn, """
-      SELECT submitted_utc, rater_id, provider, category_id, prompt_id, diversity
-      FROM responses_c ORDER BY id DESC LIMIT 10
-    """)
-    conn.close()
+def _new_a() -> Dict[str, Any]:
     return {
-        "pools": pools,
-        "totals": {"raters": total_raters, "A": A_total, "B": B_total, "C": C_total},
-        "A": {"mos": A_mos, "text": A_text, "people": A_people},
-        "B": {"ranking": B_rank},
-        "C": {"diversity": C_div},
-        "recent": {"A": recent_a, "B": recent_b, "C": recent_c}
+        "n": 0, "sum": dict.fromkeys(A_METRICS, 0), "cnt": dict.fromkeys(A_METRICS, 0),
+        "text_rows": 0, "text": dict.fromkeys(TEXT_LABELS, 0),
+        "with_rule": 0, "violations": 0,
     }
 
+def _fold_a(row: tuple):
+    (_id, submitted, rid, prov, cat, pid, seed,
+     adherence, aesthetic, creativity, style, text_corr, no_people, viol) = row
+    a = STATS["A"].get(prov)
+    if a is None:
+        a = STATS["A"][prov] = _new_a()
+    a["n"] += 1
+    for m, v in zip(A_METRICS, (adherence, aesthetic, creativity, style)):
+        if v is not None:
+            a["sum"][m] += v; a["cnt"][m] += 1
+    if text_corr:
+        a["text_rows"] += 1
+        if text_corr in a["text"]:
+            a["text"][text_corr] += 1
+    if no_people == 1:
+        a["with_rule"] += 1
+        if viol == 1:
+            a["violations"] += 1
+    STATS["recent"]["A"].appendleft({"submitted_utc": submitted, "rater_id": rid, "provider": prov,
+                                     "category_id": cat, "prompt_id": pid, "seed_label": seed})
+
+def _fold_b(row: tuple):
+    _id, submitted, rid, cat, pid, seed, *ranks = row
+    b = STATS["B"]
+    b["n"] += 1
+    for prov, rank in zip(B_PROVIDERS, ranks):
+        if rank is not None:
+            b["rank_sum"][prov] += rank; b["rank_n"][prov] += 1
+            if rank == 1:
+                b["wins"][prov] += 1
+    STATS["recent"]["B"].appendleft({"submitted_utc": submitted, "rater_id": rid,
+                                     "category_id": cat, "prompt_id": pid, "seed_label": seed})
+
+def _fold_c(row: tuple):
+    _id, submitted, rid, prov, cat, pid, diversity = row
+    c = STATS["C"].setdefault(prov, {"n": 0, "sum": 0, "cnt": 0})
+    c["n"] += 1
+    if diversity is not None:
+        c["sum"] += diversity; c["cnt"] += 1
+    STATS["recent"]["C"].appendleft({"submitted_utc": submitted, "rater_id": rid, "provider": prov,
+                                     "category_id": cat, "prompt_id": pid, "diversity": diversity})
+
+_STATS_SINCE = {
+    "A": ("""SELECT id, submitted_utc, rater_id, provider, category_id, prompt_id, seed_label,
+                    adherence, aesthetic, creativity, style, text_correctness, no_people, people_violation
+             FROM responses_a WHERE id > ? ORDER BY id""", _fold_a),
+    "B": ("""SELECT id, submitted_utc, rater_id, category_id, prompt_id, seed_label,
+                    rank_chatgpt, rank_google, rank_stability, rank_bfl
+             FROM responses_b WHERE id > ? ORDER BY id""", _fold_b),
+    "C": ("""SELECT id, submitted_utc, rater_id, provider, category_id, prompt_id, diversity
+             FROM responses_c WHERE id > ? ORDER BY id""", _fold_c),
+}
+
+# Startup seeding: the same aggregates as the _fold_* functions, one scan per table.
+_STATS_SEED = {
+    "A": """SELECT provider, COUNT(*),
+                   SUM(adherence), COUNT(adherence), SUM(aesthetic), COUNT(aesthetic),
+                   SUM(creativity), COUNT(creativity), SUM(style), COUNT(style),
+                   SUM(text_correctness <> ''), SUM(text_correctness = 'correct'),
+                   SUM(text_correctness = 'partial'), SUM(text_correctness = 'incorrect'),
+                   SUM(no_people = 1), SUM(no_people = 1 AND people_violation = 1)
+            FROM responses_a WHERE id <= ? GROUP BY provider""",
+    "B": """SELECT COUNT(*),
+                   SUM(rank_chatgpt), COUNT(rank_chatgpt), SUM(rank_chatgpt = 1),
+                   SUM(rank_google), COUNT(rank_google), SUM(rank_google = 1),
+                   SUM(rank_stability), COUNT(rank_stability), SUM(rank_stability = 1),
+                   SUM(rank_bfl), COUNT(rank_bfl), SUM(rank_bfl = 1)
+            FROM responses_b WHERE id <= ?""",
+    "C": """SELECT provider, COUNT(*), SUM(diversity), COUNT(diversity)
+            FROM responses_c WHERE id <= ? GROUP BY provider""",
+}
+
+def seed_stats(conn: sqlite3.Connection):
+    """Load STATS for a fresh process: rows older than the newest RECENT_N of each table
+    are aggregated in SQL, and refresh_stats folds the rest so the recent lists fill too."""
+    with _stats_lock:
+        last = STATS["last_id"]
+        for m, table in (("A", "responses_a"), ("B", "responses_b"), ("C", "responses_c")):
+            row = conn.execute(f"SELECT id FROM {table} ORDER BY id DESC LIMIT 1 OFFSET ?", (RECENT_N,)).fetchone()
+            if row is None or last[m] >= row[0]:
+                continue
+            cut = last[m] = row[0]
+            if m == "A":
+                for prov, n, *v in conn.execute(_STATS_SEED["A"], (cut,)):
+                    a = STATS["A"][prov] = _new_a()
+                    a["n"] = n
+                    for i, metric in enumerate(A_METRICS):
+                        a["sum"][metric] = v[2 * i] or 0; a["cnt"][metric] = v[2 * i + 1]
+                    a["text_rows"] = v[8] or 0
+                    for label, k in zip(TEXT_LABELS, v[9:12]):
+                        a["text"][label] = k or 0
+                    a["with_rule"], a["violations"] = v[12] or 0, v[13] or 0
+            elif m == "B":
+                n, *v = conn.execute(_STATS_SEED["B"], (cut,)).fetchone()
+                b = STATS["B"]; b["n"] = n
+                for i, prov in enumerate(B_PROVIDERS):
+                    b["rank_sum"][prov] = v[3 * i] or 0; b["rank_n"][prov] = v[3 * i + 1]
+                    b["wins"][prov] = v[3 * i + 2] or 0
+            else:
+                for prov, n, total, cnt in conn.execute(_STATS_SEED["C"], (cut,)):
+                    STATS["C"][prov] = {"n": n, "sum": total or 0, "cnt": cnt}
+    refresh_stats(conn)
+
+def refresh_stats(conn: sqlite3.Connection):
+    """Fold rows committed since the last refresh into STATS."""
+    global _stats_version
+    with _stats_lock:
+        last = STATS["last_id"]
+        changed = False
+        n, hi = conn.execute("SELECT COUNT(*), MAX(rowid) FROM raters WHERE rowid > ?", (last["R"],)).fetchone()
+        if n:
+            STATS["raters"] += n; last["R"] = hi; changed = True
+        for m, (sql, fold) in _STATS_SINCE.items():
+            for row in conn.execute(sql, (last[m],)):
+                fold(row)
+                last[m] = row[0]; changed = True
+        if changed:
+            _stats_version += 1
+            _stats_changed.notify_all()
+
+def wait_for_stats_change(version: int, timeout: float):
+    """Block until the stats move past `version` or `timeout` seconds pass."""
+    with _stats_changed:
+        _stats_changed.wait_for(lambda: _stats_version != version, timeout)
+
+def _avg(total: int, count: int) -> float | None:
+    """Mean rounded half-up to 2 decimals, matching SQLite's ROUND(AVG(x), 2)."""
+    if not count:
+        return None
+    return ((200 * total + count) // (2 * count)) / 100
+
+def stats_snapshot() -> Tuple[int, Tuple[int, ...], dict]:
+    """Return (version, high-water ids R/A/B/C, stats) with stats in the shape the admin dashboard expects."""
+    pools = {"pool_A": len(A_KEYS), "pool_B": len(B_SETS), "pool_C": len(C_SETS)}
+    with _stats_lock:
+        A, B, C = STATS["A"], STATS["B"], STATS["C"]
+        provs_a = sorted(A)
+        A_mos = [dict(provider=p, n=A[p]["n"],
+                      **{m: _avg(A[p]["sum"][m], A[p]["cnt"][m]) for m in A_METRICS})
+                 for p in provs_a]
+        A_text = [dict(provider=p, **A[p]["text"]) for p in provs_a if A[p]["text_rows"]]
+        A_people = [{"provider": p, "with_rule": A[p]["with_rule"], "violations": A[p]["violations"]}
+                    for p in provs_a]
+        B_rank = [{"provider": p, "n": B["n"],
+                   "avg_rank": _avg(B["rank_sum"][p], B["rank_n"][p]),
+                   "wins": B["wins"][p] if B["n"] else None}
+                  for p in B_PROVIDERS]
+        C_div = [{"provider": p, "n": C[p]["n"], "avg_diversity": _avg(C[p]["sum"], C[p]["cnt"])}
+                 for p in sorted(C)]
+        data = {
+            "pools": pools,
+            "totals": {"raters": STATS["raters"], "A": sum(a["n"] for a in A.values()),
+                       "B": B["n"], "C": sum(c["n"] for c in C.values())},
+            "A": {"mos": A_mos, "text": A_text, "people": A_people},
+            "B": {"ranking": B_rank},
+            "C": {"diversity": C_div},
+            "recent": {m: list(STATS["recent"][m]) for m in "ABC"},
+        }
+        return _stats_version, tuple(STATS["last_id"][m] for m in "RABC"), data
+
+# This process's own inserts are folded by the writer right after commit; polling the DB
+# only matters for rows other worker processes wrote, so dashboards needn't do it every hit.
+STATS_POLL_SEC = 2.0
+_stats_polled = 0.0
+
+def refresh_stats_from_db(force: bool = False):
+    global _stats_polled
+    now = time.monotonic()
+    if not force and now - _stats_polled < STATS_POLL_SEC:
+        return
+    _stats_polled = now
+    with get_conn() as conn:
+        refresh_stats(conn)
+
+def get_stats() -> dict:
+    refresh_stats_from_db(force=True)
+    return stats_snapshot()[2]
+
+def stats_payload() -> Tuple[str, bytes]:
+    """(etag, JSON body) for /admin/stats; serialized only when stats or pools change.
+
+    The ETag is built from the folded row ids and pool sizes, not the local version counter,
+    so it names the same data in every worker process and across restarts."""
+    global _stats_body
+    key = (_stats_version, len(A_KEYS), len(B_SETS), len(C_SETS))
+    cached = _stats_body
+    if cached is None or cached[0] != key:
+        version, marks, data = stats_snapshot()
+        pools = data["pools"]
+        key = (version, pools["pool_A"], pools["pool_B"], pools["pool_C"])
+        etag = "-".join(map(str, marks + key[1:]))
+        body = orjson.dumps({"ok": True, "data": data}, option=orjson.OPT_SORT_KEYS)
+        cached = _stats_body = (key, etag, body)
+    return cached[1], cached[2]
+
+# ---------------------------- HTTP caching & compression ----------------------------
+
+STATIC_MAX_AGE = 31536000  # static URLs carry ?v=<content hash>, so they can be cached forever
+GZIP_LEVEL = 4
+GZIP_MIN_BYTES = 512
+GZIP_MIMETYPES = {"text/html", "text/css", "application/javascript", "text/javascript", "application/json"}
+
+@lru_cache(maxsize=None)
+def static_version(filename: str) -> str:
+    try:
+        data = (Path(app.static_folder) / filename).read_bytes()
+    except OSError:
+        return ""
+    return hashlib.blake2b(data, digest_size=6).hexdigest()
+
+@lru_cache(maxsize=64)
+def _gzip_static(filename: str, version: str) -> bytes:
+    data = (Path(app.static_folder) / filename).read_bytes()
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+@app.url_defaults
+def _static_cache_buster(endpoint: str, values: dict):
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        v = static_version(values["filename"])
+        if v:
+            values["v"] = v
+
+@app.after_request
+def _cache_and_compress(resp):
+    is_static = request.endpoint == "static"
+    if is_static and resp.status_code in (200, 304):
+        resp.cache_control.public = True
+        resp.cache_control.max_age = STATIC_MAX_AGE
+        resp.cache_control.immutable = True
+        resp.cache_control.no_cache = None
+    if (resp.status_code != 200 or resp.mimetype not in GZIP_MIMETYPES
+            or "Content-Encoding" in resp.headers or (resp.is_streamed and not is_static)):
+        return resp
+    if "X-Sendfile" in resp.headers or "X-Accel-Redirect" in resp.headers:
+        return resp  # the front server swaps in the raw file, so the body must stay as sent
+    resp.vary.add("Accept-Encoding")
+    if "gzip" not in request.headers.get("Accept-Encoding", "").lower():
+        return resp
+    if is_static:
+        # send_file streams from disk; swap in the cached compressed copy instead
+        filename = request.view_args.get("filename", "")
+        body = _gzip_static(filename, static_version(filename))
+        resp.close()
+        resp.direct_passthrough = False
+    else:
+        data = resp.get_data()
+        if len(data) < GZIP_MIN_BYTES:
+            return resp
+        body = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    resp.set_data(body)
+    resp.headers["Content-Encoding"] = "gzip"
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)  # same entity, different bytes (as nginx does)
+    return resp
+
 # ---------------------------- Routes ----------------------------
 
 _init_lock = threading.Lock()
 _initialized = False
 
+def warm_templates():
+    """Load every template once so the first real request renders from cache."""
+    env = app.jinja_env
+    for name in env.list_templates():
+        env.get_template(name)
+
 def _init_once():
     global _initialized
     with _init_lock:
@@ -1255,36 +1826,50 @@ def _init_once():
             return
         # whatever you previously did in before_first_request:
         init_db()
-        build_tasks()
+        with get_conn() as conn:
+            seed_stats(conn)  # seed the in-memory aggregates from stored responses
+        start_db_writer()
+        # Manifests are read in the background; survey pages answer 503 until they're in
+        threading.Thread(target=_build_tasks_in_background, name="build-tasks", daemon=True).start()
+        warm_templates()
         _initialized = True
 
+# Endpoints that sample from or render the task pools
+TASK_ENDPOINTS = {"start_module", "start_full_session", "full_next", "mod_a", "mod_b", "mod_c"}
+
 @app.before_request
 def _ensure_init():
     _init_once()
+    if request.endpoint in TASK_ENDPOINTS and not _tasks_ready.is_set():
+        resp = app.response_class(
+            render_template("no_data.html", title="Warming up",
+                            message="The survey is loading its images. This page will refresh in a few seconds."),
+            status=503, mimetype="text/html")
+        resp.headers["Retry-After"] = "3"
+        resp.headers["Refresh"] = "3"
+        return resp
+
+# Pages with no per-request data are rendered once per process and served as bytes.
+# Set PRERENDER_PAGES=0 once any of them gains per-request content (e.g. a CSRF token).
+PRERENDER_PAGES = env_flag("PRERENDER_PAGES", True)
+_PAGE_CACHE: Dict[Tuple[str, str], bytes] = {}
+
+def render_static_page(name: str):
+    """render_template(name), reusing the first rendering unless flashed messages are pending."""
+    if not PRERENDER_PAGES or "_flashes" in session:
+        return render_template(name)
+    key = (name, request.script_root)
+    body = _PAGE_CACHE.get(key)
+    if body is None:
+        body = _PAGE_CACHE[key] = render_template(name).encode("utf-8")
+    return app.response_class(body, mimetype="text/html")
 
 @app.get("/")
 def home():
     rid = get_or_create_rater()
-
-    # counts
-    a_images = len(ALL_A_IMAGES)
-    a_sets = len({(m.category_id, m.prompt_id, m.seed_label) for m in ALL_A_IMAGES})
-    b_sets = len(B_SETS)
-    c_grids = len(C_SETS)
-
-    sizes = {
-        "A_sets": a_sets,
-        "A_images": a_images,
-        "B_sets": b_sets,
-        "C_grids": c_grids,
-    }
-
-    plan = session.get("plan") or sample_plan_for_rater(rid)
-    plan_sizes = session.get("plan_sizes", {"A":0,"B":0,"C":0})
-    plan_idx   = session.get("plan_idx",   {"A":0,"B":0,"C":0})
-    remaining  = {m: max(0, plan_sizes.get(m,0) - plan_idx.get(m,0)) for m in "ABC"}
-
-    return render_template("home.html", sizes=sizes, remaining=remaining, seed_labels=SEED_LABELS)
+    if not session.get("plan") and _tasks_ready.is_set():  # don't pin an empty plan while warming up
+        sample_plan_for_rater(rid)
+    return render_static_page("home.html")
 
 
 @app.get("/onboarding")
@@ -1346,21 +1931,17 @@ def mod_a():
     plan = session.get("plan") or sample_plan_for_rater(rid)
     idx = session.get("plan_idx", {}).get("A", 0)
     total = session.get("plan_sizes", {}).get("A", 0)
-    if idx >= total:
+    idx, _, row = resolve_plan_item(plan, "A", idx, total, A_BY_KEY.get)
+    if row is None:
         if session.get("full_mode"): return redirect(url_for("full_next"))
         return redirect(url_for("thanks"))
-
-    item = plan["A"][idx]
-    if hasattr(item, "__dict__") and not isinstance(item, dict):
-        item = asdict_mr(item)
-    item = hydrate_prompt_text(item)
+    item = asdict_mr(row)
 
     prepend, core = split_prompt(item["prompt_text"])
-    img_b64 = encode_path(Path(item["image_path"]))
     return render_template(
         "module_a.html",
         item=item,
-        img_b64=img_b64,
+        img_id=row.img_id,
         idx=idx + 1,
         total=total,
         prompt_core=core,
@@ -1378,24 +1959,14 @@ def submit_a():
         "prompt_id": form["prompt_id"],
         "seed_label": int(form["seed_label"])
     })
-    conn = db()
-    conn.execute("""
-        INSERT INTO responses_a(
-          rater_id, provider, model, category_id, prompt_id, seed_label,
-          image_path, prompt_text, has_text, no_people,
-          adherence, aesthetic, creativity, style,
-          text_correctness, people_violation, elapsed_ms, submitted_utc
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
+    enqueue_write("A", (
         rid, form["provider"], form["model"], form["category_id"], form["prompt_id"], int(form["seed_label"]),
         form["image_path"], form["prompt_text"], int(form.get("has_text",0)), int(form.get("no_people",0)),
         int(form["adherence"]), int(form["aesthetic"]), int(form["creativity"]), int(form["style"]),
         form.get("text_correctness",""), int(form.get("people_violation","0")),
         int(form.get("elapsed_ms","0")), datetime.utcnow().isoformat()+"Z"
     ))
-    conn.commit(); conn.close()
-    idx_all = session.get("plan_idx", {"A":0,"B":0,"C":0}); idx_all["A"] = idx_all.get("A",0) + 1
-    session["plan_idx"] = idx_all
+    advance_plan("A")
     return redirect(url_for("full_next") if session.get("full_mode") else url_for("mod_a"))
 
 # --- Module B (ranking) ---
@@ -1409,12 +1980,11 @@ def mod_b():
         return render_template("no_data.html", title="Part B is unavailable",
                                message="No matching 4-model sets were found across providers. "
                                        "Check manifests and try Reload Pools in admin.")
-    if idx >= total:
+    idx, key, rows_by_provider = resolve_plan_item(plan, "B", idx, total, B_SETS.get)
+    if rows_by_provider is None:
         if session.get("full_mode"): return redirect(url_for("full_next"))
         return redirect(url_for("thanks"))
-
-    cat, pid, seed = plan["B"][idx]  # pid = prompt_id
-    rows_by_provider = B_SETS.get((cat, pid, seed), {})
+    cat, pid, seed = key  # pid = prompt_id
 
     # Build display cards
     display = []
@@ -1427,7 +1997,7 @@ def mod_b():
                 "provider": prov,
                 "model": r.model,
                 "image_path": str(r.image_path),
-                "img_b64": encode_path(r.image_path),
+                "img_id": r.img_id,
             })
 
     # Split the REAL text prompt; fall back to prompt_id if missing
@@ -1456,23 +2026,13 @@ def submit_b():
     mark_seen_b(rid, form["category_id"], form["prompt_id"], int(form["seed_label"]))
     if len(set(ranks.values())) != 4:
         flash("Please assign unique ranks 1–4."); return redirect(url_for("mod_b"))
-    conn = db()
-    conn.execute("""
-        INSERT INTO responses_b(
-          rater_id, category_id, prompt_id, seed_label,
-          rank_chatgpt, rank_google, rank_stability, rank_bfl,
-          image_chatgpt, image_google, image_stability, image_bfl,
-          elapsed_ms, submitted_utc
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
+    enqueue_write("B", (
         rid, form["category_id"], form["prompt_id"], int(form["seed_label"]),
         ranks["chatgpt"], ranks["google"], ranks["stability"], ranks["bfl"],
         form["image_chatgpt"], form["image_google"], form["image_stability"], form["image_bfl"],
         int(form.get("elapsed_ms","0")), datetime.utcnow().isoformat()+"Z"
     ))
-    conn.commit(); conn.close()
-    idx_all = session.get("plan_idx", {"A":0,"B":0,"C":0}); idx_all["B"] = idx_all.get("B",0) + 1
-    session["plan_idx"] = idx_all
+    advance_plan("B")
     return redirect(url_for("full_next") if session.get("full_mode") else url_for("mod_b"))
 
 # --- Module C (diversity) ---
@@ -1483,28 +2043,19 @@ def mod_c():
 
     idx = session.get("plan_idx", {}).get("C", 0)
     total = session.get("plan_sizes", {}).get("C", 0)
-    if idx >= total:
+    idx, key, found = resolve_plan_item(plan, "C", idx, total, _c_item)
+    if found is None:
         if session.get("full_mode"):
             return redirect(url_for("full_next"))
         return redirect(url_for("thanks"))
 
-    # plan["C"][i] = (provider, category_id, prompt_id, [5 rows])
-    prov, cat, pid, row_objs = plan["C"][idx]
-
-    # Normalize rows to dicts and hydrate prompt text
-    norm_rows = []
-    for r in row_objs:
-        if hasattr(r, "__dict__") and not isinstance(r, dict):
-            r = asdict_mr(r)
-        r = hydrate_prompt_text(r)
-        norm_rows.append(r)
-
-    # For the visible grid (b64 URLs) and hidden payload (raw paths)
-    images = [str(r["image_path"]) for r in norm_rows]                       # hidden JSON
-    img_b64_list = [encode_path(Path(r["image_path"])) for r in norm_rows]   # <img src=...>
+    # plan["C"][i] = (provider, category_id, prompt_id)
+    prov, cat, pid = key
+    rows, paths_json = found  # paths_json: hidden payload (raw paths), built with the pool
+    img_id_list = [r.img_id for r in rows]  # <img src=...>
 
     # Use real text from any of the 5 rows; fall back to the prompt_id if missing
-    full_text = (norm_rows[0].get("prompt_text") if norm_rows else "") or pid
+    full_text = (rows[0].prompt_text if rows else "") or pid
     prepend, core = split_prompt(full_text)
 
     return render_template(
@@ -1514,8 +2065,8 @@ def mod_c():
         prompt_id=pid,              # keep ID for hidden field
         prompt_core=core,
         prompt_prepend=prepend,
-        img_b64_list=img_b64_list,  # used by template loop
-        images=images,              # used by hidden input: image_paths_json
+        img_id_list=img_id_list,    # used by template loop
+        images_json=paths_json,     # used by hidden input: image_paths_json
         idx=idx + 1,
         total=total,
     )
@@ -1528,24 +2079,16 @@ def submit_c():
     form = request.form
     # mark the grid (provider,cat,prompt) as seen
     mark_seen_c(rid, form["provider"], form["category_id"], form["prompt_id"])
-    conn = db()
-    conn.execute("""
-        INSERT INTO responses_c(
-          rater_id, provider, category_id, prompt_id, diversity,
-          image_paths_json, elapsed_ms, submitted_utc
-        ) VALUES (?,?,?,?,?,?,?,?)
-    """, (
+    enqueue_write("C", (
         rid, form["provider"], form["category_id"], form["prompt_id"], int(form["diversity"]),
         form["image_paths_json"], int(form.get("elapsed_ms","0")), datetime.utcnow().isoformat()+"Z"
     ))
-    conn.commit(); conn.close()
-    idx_all = session.get("plan_idx", {"A":0,"B":0,"C":0}); idx_all["C"] = idx_all.get("C",0) + 1
-    session["plan_idx"] = idx_all
+    advance_plan("C")
     return redirect(url_for("full_next") if session.get("full_mode") else url_for("mod_c"))
 
 @app.get("/thanks")
 def thanks():
-    return render_template("thanks.html")
+    return render_static_page("thanks.html")
 
 # --- Admin: login, dashboard, stats, reload, export ---
 @app.get("/admin/login")
@@ -1558,7 +2101,7 @@ def admin_login_post():
     correct = os.getenv("ADMIN_TOKEN","")
     if token and correct and token == correct:
         session["is_admin"] = True
-        next_url = request.args.get("next") or url_for("admin_home")
+        next_url = request.args.get("next") or url_for("admin.home")
         return redirect(next_url)
     flash("Invalid admin token."); return redirect(url_for("admin_login"))
 
@@ -1566,73 +2109,141 @@ def admin_login_post():
 def admin_logout():
     session.pop("is_admin", None); return redirect(url_for("home"))
 
-@app.get("/admin")
-@require_admin
+# Everything else under /admin lives on this blueprint; its guard runs once per
+# request before dispatch instead of wrapping every view.
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+@admin_bp.before_request
+def _require_admin():
+    if not is_admin():
+        return redirect(url_for("admin_login", next=request.path))
+
+@admin_bp.get("", endpoint="home")
 def admin_home():
     return render_template("admin.html", title="Admin Dashboard", heading="Admin Dashboard")
 
-@app.get("/admin/stats")
-@require_admin
+@admin_bp.get("/stats", endpoint="stats")
 def admin_stats():
     try:
-        stats = get_stats()
-        return jsonify({"ok": True, "data": stats})
+        refresh_stats_from_db()
+        etag, body = stats_payload()
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
-
-@app.post("/admin/reload")
-@require_admin
+    resp = app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+STREAM_POLL_SEC = 5    # also the interval for noticing other workers' writes / pool reloads
+STREAM_MAX_SEC = 300   # close periodically so a worker thread isn't held forever; EventSource reconnects
+# Each open stream pins one request thread (render.yaml: 4 per worker), so cap them per process;
+# extra dashboard tabs get a 503, which makes EventSource give up and the page fall back to polling.
+STREAM_MAX_CLIENTS = max(0, int(os.getenv("STREAM_MAX_CLIENTS", "1")))
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS) if STREAM_MAX_CLIENTS else None
+
+@admin_bp.get("/stream", endpoint="stream")
+def admin_stream():
+    if _stream_slots is None or not _stream_slots.acquire(blocking=False):
+        resp = jsonify({"ok": False, "error": "Too many open streams; poll /admin/stats instead."})
+        resp.status_code = 503
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    def events():
+        sent = None
+        deadline = time.monotonic() + STREAM_MAX_SEC
+        while time.monotonic() < deadline:
+            refresh_stats_from_db()
+            version = _stats_version
+            etag, body = stats_payload()
+            if etag != sent:
+                sent = etag
+                yield b"data: " + body + b"\n\n"
+            else:
+                yield b": ping\n\n"
+            wait_for_stats_change(version, STREAM_POLL_SEC)
+    resp = app.response_class(events(), mimetype="text/event-stream")
+    resp.call_on_close(_stream_slots.release)  # runs when the server closes the response, even on disconnect
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return resp
+
+@admin_bp.post("/reload", endpoint="reload")
 def admin_reload():
     try:
-        build_tasks()
+        rebuild_tasks()
         stats = get_stats()
         return jsonify({"ok": True, "message": "Task pools rebuilt from latest manifests.", "data": stats})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
-@app.get("/admin/export")
-@require_admin
+@admin_bp.get("/export", endpoint="export")
 def admin_export():
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     out_a = EXPORT_DIR / f"responses_a_{ts}.csv"
     out_b = EXPORT_DIR / f"responses_b_{ts}.csv"
     out_c = EXPORT_DIR / f"responses_c_{ts}.csv"
-    conn = db()
-    for table, path in [("responses_a", out_a), ("responses_b", out_b), ("responses_c", out_c)]:
-        rows = conn.execute(f"SELECT * FROM {table}").fetchall()
-        if rows:
-            with open(path, "w", encoding="utf-8", newline="") as f:
-                w = csv.writer(f); w.writerow(rows[0].keys())
-                for r in rows: w.writerow([r[k] for k in r.keys()])
-    conn.close()
-    return jsonify({"exported": True, "files": [str(out_a), str(out_b), str(out_c)]})
+    pending = flush_writes(EXPORT_FLUSH_SEC)  # include submissions still sitting in the write queue
+    with get_conn() as conn:
+        for table, path in [("responses_a", out_a), ("responses_b", out_b), ("responses_c", out_c)]:
+            # Rows go from the cursor straight to the file, never all in memory at once
+            with closing(conn.execute(f"SELECT * FROM {table}")) as cur, \
+                 open(path, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f); w.writerow([d[0] for d in cur.description])
+                w.writerows(cur)
+    return jsonify({"exported": True, "files": [str(out_a), str(out_b), str(out_c)], "pending_rows": pending})
+
+EXPORT_TABLES = {"a": "responses_a", "b": "responses_b", "c": "responses_c"}
+EXPORT_BATCH = 10000
+
+@admin_bp.get("/export/<module_id>.csv", endpoint="export_csv")
+def admin_export_csv(module_id: str):
+    """Stream one responses table as CSV, EXPORT_BATCH rows at a time."""
+    table = EXPORT_TABLES.get(module_id.lower())
+    if table is None:
+        abort(404)
+    pending = flush_writes(EXPORT_FLUSH_SEC)  # include submissions still sitting in the write queue
+
+    def rows():
+        with get_conn() as conn, closing(conn.execute(f"SELECT * FROM {table} ORDER BY id")) as cur:
+            buf = io.StringIO(); w = csv.writer(buf)
+            w.writerow([d[0] for d in cur.description])
+            while True:
+                batch = cur.fetchmany(EXPORT_BATCH)
+                if not batch:
+                    break
+                w.writerows(batch)
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    resp = app.response_class(rows(), mimetype="text/csv")
+    resp.headers["Content-Disposition"] = f"attachment; filename={table}_{ts}.csv"
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Pending-Rows"] = str(pending)  # queued rows not yet in this file
+    return resp
 
 # --- Clear in-memory "seen" caches ---
 
-@app.post("/admin/clear_seen_me")
-@require_admin
+@admin_bp.post("/clear_seen_me", endpoint="clear_seen_me")
 def admin_clear_seen_me():
     rid = session.get("rater_id", "")
-    with _seen_lock:
-        SEEN_A.pop(rid, None)
-        SEEN_B.pop(rid, None)
-        SEEN_C.pop(rid, None)
+    clear_seen(rid)
     # optional: also reset this rater's current plan/progress
     session.pop("plan", None)
     session.pop("plan_idx", None)
     session.pop("plan_sizes", None)
     return jsonify({"ok": True, "cleared_for": rid})
 
-@app.post("/admin/clear_seen_all")
-@require_admin
+@admin_bp.post("/clear_seen_all", endpoint="clear_seen_all")
 def admin_clear_seen_all():
-    with _seen_lock:
-        SEEN_A.clear()
-        SEEN_B.clear()
-        SEEN_C.clear()
+    clear_seen()
     # optional: does not touch user sessions
     return jsonify({"ok": True})
 
+app.register_blueprint(admin_bp)
+
 
 # ---------------------------- Main ----------------------------
 if __name__ == "__main__":